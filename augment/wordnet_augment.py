@@ -7,20 +7,47 @@ from __future__ import annotations
 
 import json
 import re
+from functools import lru_cache
+from multiprocessing import Pool
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, Iterator, List, Set, Tuple
 
 import nltk
 from nltk.corpus import wordnet as wn
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 ROOT = Path(__file__).resolve().parents[1]
 PRED_PATH = ROOT / "wsd" / "results" / "predictions_bert_semcor.json"
 OUT_PATH = ROOT / "kb" / "kb_aug.pl"
 
+# Below this many predictions, worker start-up costs more than it saves.
+PARALLEL_MIN_PREDICTIONS = 2000
+
+
+class _SlugTable(dict):
+    """str.translate table mapping every character outside [a-z0-9] to "_"."""
+
+    def __missing__(self, c: int) -> str:
+        ch = chr(c)
+        v = ch if ("a" <= ch <= "z" or "0" <= ch <= "9") else "_"
+        self[c] = v
+        return v
+
+
+_SLUG_TABLE = _SlugTable()
+_UNDERSCORE_RUN_RE = re.compile(r"__+")
+
 
 def slug(s: str) -> str:
-    s = s.lower()
-    s = re.sub(r"[^a-z0-9]+", "_", s).strip("_")
+    s = s.lower().translate(_SLUG_TABLE)
+    if "__" in s:
+        s = _UNDERSCORE_RUN_RE.sub("_", s)
+    s = s.strip("_")
     if not s:
         return "x"
     if s[0].isdigit():
@@ -28,46 +55,100 @@ def slug(s: str) -> str:
     return s
 
 
-def main() -> None:
-    if not PRED_PATH.exists():
-        raise FileNotFoundError(f"Missing {PRED_PATH}. Run wsd/predict_in_domain.py first.")
+def loads_json(data: bytes):
+    """Parse JSON from raw bytes, via orjson when available."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
 
-    obj = json.loads(PRED_PATH.read_text(encoding="utf-8"))
-    preds = obj.get("predictions", [])
 
-    facts: List[str] = []
-    facts.append("% kb_aug.pl (auto-generated WordNet augmentation)")
-    facts.append("% Provides: synonym/2, is_a/2")
+_PRED_CACHE: Dict[Tuple[Path, int], dict] = {}
 
-    seen: Set[str] = set()
 
-    for ex in preds:
-        lemma = ex["lemma"]
-        syn_name = ex.get("model") or ex.get("mfs")
-        if not syn_name:
-            continue
-        try:
-            syn = wn.synset(syn_name)
-        except Exception:
+def load_predictions(path: Path = PRED_PATH) -> dict:
+    """Parse a predictions file, reusing the parsed object while its mtime is unchanged."""
+    key = (path, path.stat().st_mtime_ns)
+    obj = _PRED_CACHE.get(key)
+    if obj is None:
+        _PRED_CACHE.clear()
+        obj = _PRED_CACHE[key] = loads_json(path.read_bytes())
+    return obj
+
+
+@lru_cache(maxsize=None)
+def get_synset(name: str):
+    try:
+        return wn.synset(name)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=None)
+def lemma_names(syn) -> Tuple[str, ...]:
+    return tuple(syn.lemma_names())
+
+
+@lru_cache(maxsize=None)
+def hypernyms(syn) -> tuple:
+    return tuple(syn.hypernyms())
+
+
+def prediction_facts(ex: dict) -> List[str]:
+    """synonym/2 and is_a/2 facts for a single prediction (may contain duplicates)."""
+    syn_name = ex.get("model") or ex.get("mfs")
+    if not syn_name:
+        return []
+    syn = get_synset(syn_name)
+    if syn is None:
+        return []
+
+    term = slug(ex["lemma"])
+    facts = [f"synonym({term}, {slug(l)})." for l in lemma_names(syn)]
+
+    for h in hypernyms(syn):
+        names = lemma_names(h)
+        if not names:
             continue
+        facts.append(f"is_a({term}, {slug(names[0])}).")
+    return facts
+
 
-        term = slug(lemma)
+def _init_worker() -> None:
+    # Load WordNet once per worker process instead of lazily per lookup.
+    wn.ensure_loaded()
 
-        for l in syn.lemma_names():
-            l2 = slug(l)
-            f = f"synonym({term}, {l2})."
-            if f not in seen:
-                seen.add(f); facts.append(f)
 
-        for h in syn.hypernyms():
-            if not h.lemma_names():
-                continue
-            hyper = slug(h.lemma_names()[0])
-            f = f"is_a({term}, {hyper})."
-            if f not in seen:
-                seen.add(f); facts.append(f)
+def iter_prediction_facts(preds: List[dict]) -> Iterator[List[str]]:
+    """Yield the facts of each prediction in input order, in parallel for large inputs."""
+    if len(preds) < PARALLEL_MIN_PREDICTIONS:
+        _init_worker()
+        yield from map(prediction_facts, preds)
+        return
+    with Pool(initializer=_init_worker) as pool:
+        yield from pool.imap(prediction_facts, preds, chunksize=256)
+
+
+def main() -> None:
+    try:
+        obj = load_predictions(PRED_PATH)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Missing {PRED_PATH}. Run wsd/predict_in_domain.py first.") from None
+    preds = obj.get("predictions", [])
+
+    # Stream facts straight to disk; `seen` is only kept for deduplication.
+    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    seen: Set[str] = set()
+    with OUT_PATH.open("w", encoding="utf-8", buffering=1 << 20) as fh:
+        fh.write("% kb_aug.pl (auto-generated WordNet augmentation)\n")
+        fh.write("% Provides: synonym/2, is_a/2\n")
+
+        for facts in iter_prediction_facts(preds):
+            for f in facts:
+                if f not in seen:
+                    seen.add(f)
+                    fh.write(f)
+                    fh.write("\n")
 
-    OUT_PATH.write_text("\n".join(facts) + "\n", encoding="utf-8")
     print(f"[OK] Wrote: {OUT_PATH}")
 
 
@@ -8,7 +8,7 @@ from __future__ import annotations
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 ROOT = Path(__file__).resolve().parent
 PROJECT_ROOT = ROOT.parent
@@ -17,80 +17,104 @@ VOCAB_JSON = PROJECT_ROOT / "out" / "vocabulary.json"
 KB_OUT = PROJECT_ROOT / "kb" / "kb.pl"
 FOL_MD_OUT = PROJECT_ROOT / "kb" / "kb_fol.md"
 
+# Every literal probed by extract_facts. They are matched in a single regex pass
+# (zero-width lookahead so overlapping keywords are still reported).
+FACT_KEYWORDS = [
+    "collect", "google account", "provide", "provided", "content",
+    "cookie", "server log", "server logs",
+    "device", "devices", "browser", "browsers", "app", "apps", "ip address", "ip",
+    "vary", "varies", "not signed", "not signed in",
+    "unique identifier", "unique identifiers", "identifier",
+    "deliver", "maintain", "keep", "improve", "personalize", "communicate",
+    "protect", "fraud", "abuse", "security", "risk",
+    "retain", "retention", "kept", "auto-delete", "auto delete", "delete",
+    "business needs", "legal needs",
+]
+_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(FACT_KEYWORDS, key=len, reverse=True))) + "))"
+)
+# The regex reports the longest keyword starting at each position; shorter
+# keywords that are substrings of it are implied.
+_KEYWORD_IMPLIES = {k: {o for o in FACT_KEYWORDS if o in k} for k in FACT_KEYWORDS}
+
+
+_NORM_TRANS = str.maketrans({"–": "-", "—": "-", "…": "..."})
+_WS_RE = re.compile(r"\s+")
+
 
 def norm(s: str) -> str:
-    s = s.lower()
-    s = s.replace("–", "-").replace("—", "-")
-    s = s.replace("…", "...")  
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    return _WS_RE.sub(" ", s.lower().translate(_NORM_TRANS)).strip()
 
 
 def load_vocab_constants() -> Dict[str, List[str]]:
-    if not VOCAB_JSON.exists():
+    try:
+        obj = json.loads(VOCAB_JSON.read_bytes())
+    except FileNotFoundError:
         return {}
-    obj = json.loads(VOCAB_JSON.read_text(encoding="utf-8"))
     return obj.get("constants_by_type", {})
 
 
-def extract_facts(text: str) -> Tuple[List[str], List[str]]:
-  
+def find_keywords(t: str) -> Set[str]:
+    hits: Set[str] = set()
+    for k in set(_KEYWORD_RE.findall(t)):
+        hits |= _KEYWORD_IMPLIES[k]
+    return hits
+
+
+def extract_facts(text: str) -> List[Tuple[str, ...]]:
+    """
+    Return the KB as statements; each statement is a tuple of facts that is
+    rendered as one conjunction in the FOL summary.
+    """
     t = norm(text)
+    hits = find_keywords(t)
 
-    facts: List[str] = []
-    fol_lines: List[str] = []
+    statements: List[Tuple[str, ...]] = []
 
     # Always declare main actors
-    facts += ["company(google).", "actor(google).", "actor(user)."]
-    fol_lines += ["- company(google) ∧ actor(google) ∧ actor(user)."]
+    statements.append(("company(google).", "actor(google).", "actor(user)."))
 
     # Collects information
-    if "collect" in t:
-        facts.append("collects(google, information).")
-        fol_lines.append("- collects(google, information).")
+    if "collect" in hits:
+        statements.append(("collects(google, information).",))
 
     # Personal information / Google Account (best-effort)
-    if "google account" in t:
-        facts.append("context(google_account).")
-        fol_lines.append("- context(google_account).")
-        if "provide" in t or "provided" in t:
-            facts.append("collects(google, personal_information).")
-            facts.append("purpose(google, personal_information, create_or_use_account).")
-            fol_lines.append("- collects(google, personal_information) ∧ purpose(google, personal_information, create_or_use_account).")
+    if "google account" in hits:
+        statements.append(("context(google_account).",))
+        if "provide" in hits or "provided" in hits:
+            statements.append((
+                "collects(google, personal_information).",
+                "purpose(google, personal_information, create_or_use_account).",
+            ))
 
     # Content collection
-    if "content" in t:
-        facts.append("collects_content(google, user_content).")
-        fol_lines.append("- collects_content(google, user_content).")
+    if "content" in hits:
+        statements.append(("collects_content(google, user_content).",))
 
     # Technologies: cookies and server logs
-    if "cookie" in t:
-        facts.append("uses_technology(google, cookies).")
-        fol_lines.append("- uses_technology(google, cookies).")
-    if "server log" in t or "server logs" in t:
-        facts.append("uses_technology(google, server_logs).")
-        fol_lines.append("- uses_technology(google, server_logs).")
+    if "cookie" in hits:
+        statements.append(("uses_technology(google, cookies).",))
+    if "server log" in hits or "server logs" in hits:
+        statements.append(("uses_technology(google, server_logs).",))
 
     # Technical data examples: apps/browsers/devices/IP
     tech_markers = ["device", "devices", "browser", "browsers", "app", "apps", "ip address", "ip"]
-    if any(m in t for m in tech_markers):
-        facts.append("collects_tech_data(google, technical_data).")
-        fol_lines.append("- collects_tech_data(google, technical_data).")
-    if "ip address" in t:
-        facts.append("collects_tech_data(google, ip_address).")
-        fol_lines.append("- collects_tech_data(google, ip_address).")
+    if any(m in hits for m in tech_markers):
+        statements.append(("collects_tech_data(google, technical_data).",))
+    if "ip address" in hits:
+        statements.append(("collects_tech_data(google, ip_address).",))
 
     # Varies by usage and privacy controls
-    if "vary" in t or "varies" in t:
-        facts.append("varies_by(data_collection, service_usage).")
-        facts.append("varies_by(data_collection, privacy_controls).")
-        fol_lines.append("- varies_by(data_collection, service_usage) ∧ varies_by(data_collection, privacy_controls).")
+    if "vary" in hits or "varies" in hits:
+        statements.append((
+            "varies_by(data_collection, service_usage).",
+            "varies_by(data_collection, privacy_controls).",
+        ))
 
     # Not signed in -> unique identifiers to store preferences
-    if "not signed" in t or "not signed in" in t:
-        if "unique identifier" in t or "unique identifiers" in t or "identifier" in t:
-            facts.append("stores_under_identifier(google, unique_identifier, not_signed_in, remember_preferences).")
-            fol_lines.append("- stores_under_identifier(google, unique_identifier, not_signed_in, remember_preferences).")
+    if "not signed" in hits or "not signed in" in hits:
+        if "unique identifier" in hits or "unique identifiers" in hits or "identifier" in hits:
+            statements.append(("stores_under_identifier(google, unique_identifier, not_signed_in, remember_preferences).",))
 
     # Purposes
     purpose_map = {
@@ -109,36 +133,36 @@ def extract_facts(text: str) -> Tuple[List[str], List[str]]:
     }
     purposes = set()
     for k, v in purpose_map.items():
-        if k in t:
+        if k in hits:
             purposes.add(v)
 
     for p in sorted(purposes):
-        facts.append(f"uses_for(google, {p}).")
-        fol_lines.append(f"- uses_for(google, {p}).")
+        statements.append((f"uses_for(google, {p}).",))
 
     # Retention + delete/auto-delete + business/legal needs
-    if "retain" in t or "retention" in t or "kept" in t:
-        facts.append("retains(google, data, retention_policy).")
-        fol_lines.append("- retains(google, data, retention_policy).")
-
-    if "auto-delete" in t or "auto delete" in t:
-        facts.append("allows_setting(google, auto_delete).")
-        fol_lines.append("- allows_setting(google, auto_delete).")
-    if "delete" in t:
-        facts.append("allows_setting(google, delete).")
-        fol_lines.append("- allows_setting(google, delete).")
-
-    if "business needs" in t:
-        facts.append("may_keep_longer_for(google, data, business_needs).")
-        fol_lines.append("- may_keep_longer_for(google, data, business_needs).")
-    if "legal needs" in t:
-        facts.append("may_keep_longer_for(google, data, legal_needs).")
-        fol_lines.append("- may_keep_longer_for(google, data, legal_needs).")
+    if "retain" in hits or "retention" in hits or "kept" in hits:
+        statements.append(("retains(google, data, retention_policy).",))
+
+    if "auto-delete" in hits or "auto delete" in hits:
+        statements.append(("allows_setting(google, auto_delete).",))
+    if "delete" in hits:
+        statements.append(("allows_setting(google, delete).",))
+
+    if "business needs" in hits:
+        statements.append(("may_keep_longer_for(google, data, business_needs).",))
+    if "legal needs" in hits:
+        statements.append(("may_keep_longer_for(google, data, legal_needs).",))
 
+    return statements
+
+
+def unique_facts(statements: List[Tuple[str, ...]]) -> List[str]:
     # Deduplicate while preserving order
-    seen = set()
-    facts = [f for f in facts if not (f in seen or seen.add(f))]
-    return facts, fol_lines
+    return list(dict.fromkeys(f for st in statements for f in st))
+
+
+def fol_line(statement: Tuple[str, ...]) -> str:
+    return "- " + " ∧ ".join(f.rstrip(".") for f in statement) + "."
 
 
 def write_kb(facts: List[str]) -> None:
@@ -148,24 +172,35 @@ def write_kb(facts: List[str]) -> None:
         "% --- derived relations (optional) ---",
         "technology(T) :- uses_technology(google, T).",
     ]
-    KB_OUT.write_text("\n".join(["% kb.pl (auto-generated)"] + facts + rules) + "\n", encoding="utf-8")
+    with KB_OUT.open("w", encoding="utf-8") as fh:
+        fh.write("% kb.pl (auto-generated)\n")
+        for line in facts:
+            fh.write(line)
+            fh.write("\n")
+        for line in rules:
+            fh.write(line)
+            fh.write("\n")
 
 
-def write_fol_md(lines: List[str]) -> None:
+def write_fol_md(statements: List[Tuple[str, ...]]) -> None:
     FOL_MD_OUT.parent.mkdir(parents=True, exist_ok=True)
-    md = ["Manual Translation Summary (FOL-ish)\n", "## Statements derived from the paragraph\n"]
-    md += lines
-   
-    FOL_MD_OUT.write_text("\n".join(md), encoding="utf-8")
-
-
-def main() -> None:
-    if not PAR_PATH.exists():
-        raise FileNotFoundError(f"Missing {PAR_PATH}")
-    text = PAR_PATH.read_text(encoding="utf-8", errors="ignore").strip()
-    facts, fol_lines = extract_facts(text)
-    write_kb(facts)
-    write_fol_md(fol_lines)
+    with FOL_MD_OUT.open("w", encoding="utf-8") as fh:
+        fh.write("Manual Translation Summary (FOL-ish)\n")
+        fh.write("\n## Statements derived from the paragraph\n")
+        for st in statements:
+            fh.write("\n")
+            fh.write(fol_line(st))
+
+
+def main(text: Optional[str] = None) -> None:
+    if text is None:
+        try:
+            text = PAR_PATH.read_text(encoding="utf-8", errors="ignore").strip()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Missing {PAR_PATH}") from None
+    statements = extract_facts(text)
+    write_kb(unique_facts(statements))
+    write_fol_md(statements)
     print(f"[OK] Wrote KB: {KB_OUT}")
     print(f"[OK] Wrote FOL summary: {FOL_MD_OUT}")
 
@@ -18,8 +18,15 @@ import argparse
 import json
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 
 # --------- 1) Domain phrases you want to treat as single terms ----------
@@ -110,11 +117,45 @@ def read_text(path: Path) -> str:
     return path.read_text(encoding="utf-8", errors="ignore").strip()
 
 
+_NORM_TRANS = str.maketrans({"–": "-", "—": "-"})
+_WS_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=8)
 def normalize(s: str) -> str:
-    s = s.lower()
-    s = s.replace("–", "-").replace("—", "-")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    # Cached: extract_terms and pick_predicates both normalize the same full text.
+    return _WS_RE.sub(" ", s.lower().translate(_NORM_TRANS)).strip()
+
+
+# Category keywords normalized once at import rather than per term.
+_CATEGORY_KEYWORDS_NORM: Dict[str, List[str]] = {
+    cat: [normalize(k) for k in keys] for cat, keys in CATEGORY_KEYWORDS.items()
+}
+
+
+def _build_keyword_index() -> Tuple[Dict[str, str], List[Tuple[int, str, str]]]:
+    """
+    Exact keyword -> category (earliest category wins), plus the multi-word
+    keywords that may also match as a substring, as (rank, keyword, category)
+    in category order.
+    """
+    exact: Dict[str, str] = {}
+    multiword: List[Tuple[int, str, str]] = []
+    for rank, (cat, keys) in enumerate(_CATEGORY_KEYWORDS_NORM.items()):
+        for key in keys:
+            exact.setdefault(key, cat)
+            if " " in key:
+                multiword.append((rank, key, cat))
+    return exact, multiword
+
+
+_KEYWORD_TO_CATEGORY, _MULTIWORD_KEYWORDS = _build_keyword_index()
+_PHRASES_NORM: Tuple[str, ...] = tuple(dict.fromkeys(normalize(ph) for ph in PHRASES))
+_PREDICATE_TRIGGERS_NORM: Dict[str, Tuple[str, ...]] = {
+    name: tuple(normalize(tr) for tr in triggers) for name, triggers in PREDICATE_TRIGGER_KEYWORDS.items()
+}
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_CATEGORY_RANK: Dict[str, int] = {cat: i for i, cat in enumerate(_CATEGORY_KEYWORDS_NORM)}
 
 
 def extract_terms(text: str) -> Set[str]:
@@ -125,20 +166,11 @@ def extract_terms(text: str) -> Set[str]:
     """
     t = normalize(text)
 
-    terms: Set[str] = set()
-
     # 1) extract multi-word phrases first (exact substring match)
-    for ph in PHRASES:
-        ph_norm = normalize(ph)
-        if ph_norm in t:
-            terms.add(ph_norm)
+    terms: Set[str] = {ph for ph in _PHRASES_NORM if ph in t}
 
     # 2) basic tokenization for single terms
-    tokens = re.findall(r"[a-z]+(?:'[a-z]+)?", t)
-    for tok in tokens:
-        if len(tok) <= 2:
-            continue
-        terms.add(tok)
+    terms.update(tok for tok in _TOKEN_RE.findall(t) if len(tok) > 2)
 
     return terms
 
@@ -148,20 +180,17 @@ def categorize_terms(terms: Set[str]) -> Dict[str, Set[str]]:
     categorized["other"] = set()
 
     for term in terms:
-        placed = False
-        for cat, keys in CATEGORY_KEYWORDS.items():
-            for key in keys:
-                key_norm = normalize(key)
-                # match if term equals key, or term contains key for multi-words
-                if term == key_norm or (len(key_norm.split()) > 1 and key_norm in term):
-                    categorized[cat].add(term)
-                    placed = True
+        cat = _KEYWORD_TO_CATEGORY.get(term)
+        # a multi-word key contained in the term wins if its category comes first
+        if " " in term:
+            rank = _CATEGORY_RANK[cat] if cat else len(_CATEGORY_RANK)
+            for key_rank, key_norm, key_cat in _MULTIWORD_KEYWORDS:
+                if key_rank >= rank:
                     break
-            if placed:
-                break
-
-        if not placed:
-            categorized["other"].add(term)
+                if key_norm in term:
+                    cat = key_cat
+                    break
+        categorized[cat or "other"].add(term)
 
     return categorized
 
@@ -172,8 +201,8 @@ def pick_predicates(text: str, terms: Set[str]) -> List[PredicateSig]:
 
     selected: List[PredicateSig] = []
     for name, arity, template in DEFAULT_PREDICATES:
-        triggers = PREDICATE_TRIGGER_KEYWORDS.get(name, [])
-        keep = any(normalize(tr) in joined for tr in triggers)
+        triggers = _PREDICATE_TRIGGERS_NORM.get(name, ())
+        keep = any(tr in joined for tr in triggers)
         if keep:
             selected.append(PredicateSig(name=name, arity=arity, template=template))
 
@@ -191,9 +220,16 @@ def to_sorted_list(s: Set[str]) -> List[str]:
     return sorted(s, key=lambda x: (len(x.split()), x))
 
 
+def dumps_json(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON, via orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
 def write_json(out_path: Path, obj: dict) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    out_path.write_bytes(dumps_json(obj))
 
 
 def write_md(out_path: Path, vocab: dict) -> None:
@@ -220,6 +256,19 @@ def write_md(out_path: Path, vocab: dict) -> None:
     out_path.write_text("\n".join(lines), encoding="utf-8")
 
 
+class _PrologAtomTable(dict):
+    """str.translate table mapping every character outside [a-z0-9_] to "_"."""
+
+    def __missing__(self, c: int) -> str:
+        ch = chr(c)
+        v = ch if ("a" <= ch <= "z" or "0" <= ch <= "9") else "_"
+        self[c] = v
+        return v
+
+
+_PROLOG_ATOM_TABLE = _PrologAtomTable()
+
+
 def write_prolog(out_path: Path, vocab: dict) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -229,7 +278,7 @@ def write_prolog(out_path: Path, vocab: dict) -> None:
     for cat, items in vocab["constants_by_type"].items():
         prolog_cat = cat.lower()
         for it in items:
-            const = re.sub(r"[^a-z0-9_]", "_", it.lower())
+            const = it.lower().translate(_PROLOG_ATOM_TABLE)
             lines.append(f"entity_type({const}, {prolog_cat}).")
 
     lines.append("\n% Predicate signatures")
@@ -239,26 +288,38 @@ def write_prolog(out_path: Path, vocab: dict) -> None:
     out_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
 
-def main() -> None:
+def parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser()
     ap.add_argument("--paragraph", required=True, type=str, help="Path to paragraph.txt")
     ap.add_argument("--questions", required=False, type=str, help="Optional path to questions.txt")
     ap.add_argument("--outdir", default="out", type=str, help="Output directory")
-    args = ap.parse_args()
+    return ap.parse_args()
 
-    paragraph_path = Path(args.paragraph)
-    if not paragraph_path.exists():
-        raise FileNotFoundError(f"paragraph not found: {paragraph_path}")
 
-    paragraph = read_text(paragraph_path)
+def main(
+    paragraph: Path,
+    outdir: Path,
+    questions: Optional[Path] = None,
+    paragraph_text: Optional[str] = None,
+) -> None:
+    """
+    Build the vocabulary outputs. Pass `paragraph_text` when the caller has
+    already read `paragraph` to skip reading it again.
+    """
+    if paragraph_text is None:
+        try:
+            paragraph_text = read_text(paragraph)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"paragraph not found: {paragraph}") from None
 
     questions_text = ""
-    if args.questions:
-        qpath = Path(args.questions)
-        if qpath.exists():
-            questions_text = read_text(qpath)
+    if questions:
+        try:
+            questions_text = read_text(questions)
+        except FileNotFoundError:
+            pass
 
-    combined_text = paragraph + ("\n" + questions_text if questions_text else "")
+    combined_text = paragraph_text + ("\n" + questions_text if questions_text else "")
 
     terms = extract_terms(combined_text)
     categorized = categorize_terms(terms)
@@ -266,14 +327,13 @@ def main() -> None:
 
     vocab = {
         "source_files": {
-            "paragraph": str(paragraph_path),
-            "questions": str(args.questions) if args.questions else None,
+            "paragraph": str(paragraph),
+            "questions": str(questions) if questions else None,
         },
         "constants_by_type": {cat: to_sorted_list(items) for cat, items in categorized.items()},
         "predicates": [{"name": p.name, "arity": p.arity, "template": p.template} for p in preds],
     }
 
-    outdir = Path(args.outdir)
     write_json(outdir / "vocabulary.json", vocab)
     write_md(outdir / "vocabulary.md", vocab)
     write_prolog(outdir / "vocab.pl", vocab)
@@ -284,4 +344,9 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(
+        Path(args.paragraph),
+        Path(args.outdir),
+        Path(args.questions) if args.questions else None,
+    )
@@ -19,8 +19,15 @@ from __future__ import annotations
 
 import json
 import re
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import FrozenSet, List, Set, Tuple
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 ROOT = Path(__file__).resolve().parent
 PROJECT_ROOT = ROOT.parent
@@ -33,16 +40,76 @@ OUT_JSON = OUT_DIR / "queries.json"
 OUT_MD = OUT_DIR / "queries.md"
 
 
+@dataclass(slots=True)
+class QueryItem:
+    qid: str
+    question: str
+    prolog_query: str
+    answer_shape: str
+
+
+_WS_RE = re.compile(r"\s+")
+_QID_RE = re.compile(r"^(q\d+)\s+(.*)$", re.IGNORECASE)
+_VAR_RE = re.compile(r"\b[A-Z][A-Za-z0-9_]*\b")
+
+# Question -> query rules, tried in order. Each rule is a tuple of clauses;
+# a clause is satisfied when the question contains any one of its tags.
+QUERY_RULES: List[Tuple[Tuple[FrozenSet[str], ...], str, str]] = [
+    (
+        (frozenset({"what information"}), frozenset({"collect"})),
+        "collects(google, X).", "X (all collected data types)",
+    ),
+    (
+        (frozenset({"why"}), frozenset({"collect", "use"})),
+        "uses_for(google, Purpose).", "Purpose (all purposes)",
+    ),
+    (
+        (frozenset({"depend"}), frozenset({"privacy control"})),
+        "varies_by(data_collection, privacy_controls).", "true/false",
+    ),
+    (
+        (frozenset({"not signed"}), frozenset({"identifier"})),
+        "stores_under_identifier(google, unique_identifier, not_signed_in, Purpose).", "Purpose",
+    ),
+    (
+        (frozenset({"google account"}), frozenset({"what", "information"})),
+        "purpose(google, personal_information, create_or_use_account).", "true/false",
+    ),
+    (
+        (frozenset({"content"}), frozenset({"create", "upload", "collect"})),
+        "collects_content(google, X).", "X (content type)",
+    ),
+    (
+        (frozenset({"technology", "technologies"}), frozenset({"cookie", "server log", "logs"})),
+        "uses_technology(google, Tech).", "Tech",
+    ),
+    (
+        (frozenset({"how long", "retain", "keep data"}), frozenset({"delete", "auto"})),
+        "retains(google, data, Policy), allows_setting(google, delete), (allows_setting(google, auto_delete) ; true).",
+        "Policy + delete/auto-delete availability",
+    ),
+]
+
+# All tags are found in one regex pass (zero-width lookahead so overlapping
+# tags are still reported); shorter tags inside the longest match are implied.
+TAGS = sorted({tag for clauses, _, _ in QUERY_RULES for alts in clauses for tag in alts})
+_TAG_RE = re.compile("(?=(" + "|".join(map(re.escape, sorted(TAGS, key=len, reverse=True))) + "))")
+_TAG_IMPLIES = {k: {o for o in TAGS if o in k} for k in TAGS}
+
+
 def norm(s: str) -> str:
-    return re.sub(r"\s+", " ", s.strip().lower())
+    return _WS_RE.sub(" ", s.strip().lower())
 
 
 def read_questions() -> List[Tuple[str, str]]:
-    path = QUESTIONS_PATH if QUESTIONS_PATH.exists() else QUESTIONS_EXAMPLE
-    lines = [ln.strip() for ln in path.read_text(encoding="utf-8", errors="ignore").splitlines() if ln.strip()]
+    try:
+        raw = QUESTIONS_PATH.read_text(encoding="utf-8", errors="ignore")
+    except FileNotFoundError:
+        raw = QUESTIONS_EXAMPLE.read_text(encoding="utf-8", errors="ignore")
+    lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
     items: List[Tuple[str, str]] = []
     for i, ln in enumerate(lines, 1):
-        m = re.match(r"^(q\d+)\s+(.*)$", ln.strip(), flags=re.IGNORECASE)
+        m = _QID_RE.match(ln)
         if m:
             qid, qtext = m.group(1).upper(), m.group(2).strip()
         else:
@@ -51,87 +118,87 @@ def read_questions() -> List[Tuple[str, str]]:
     return items
 
 
+def find_tags(t: str) -> FrozenSet[str]:
+    tags: Set[str] = set()
+    for k in set(_TAG_RE.findall(t)):
+        tags |= _TAG_IMPLIES[k]
+    return frozenset(tags)
+
+
 def map_question_to_query(qtext: str) -> Tuple[str, str]:
-    t = norm(qtext)
-
-    if "what information" in t and "collect" in t:
-        return "collects(google, X).", "X (all collected data types)"
-    if "why" in t and ("collect" in t or "use" in t):
-        return "uses_for(google, Purpose).", "Purpose (all purposes)"
-    if "depend" in t and "privacy control" in t:
-        return "varies_by(data_collection, privacy_controls).", "true/false"
-    if "not signed" in t and "identifier" in t:
-        return "stores_under_identifier(google, unique_identifier, not_signed_in, Purpose).", "Purpose"
-    if ("google account" in t) and ("what" in t or "information" in t):
-        return "purpose(google, personal_information, create_or_use_account).", "true/false"
-    if "content" in t and ("create" in t or "upload" in t or "collect" in t):
-        return "collects_content(google, X).", "X (content type)"
-    if ("technology" in t or "technologies" in t) and ("cookie" in t or "server log" in t or "logs" in t):
-        return "uses_technology(google, Tech).", "Tech"
-    if ("how long" in t or "retain" in t or "keep data" in t) and ("delete" in t or "auto" in t):
-        return "retains(google, data, Policy), allows_setting(google, delete), (allows_setting(google, auto_delete) ; true).", "Policy + delete/auto-delete availability"
+    tags = find_tags(norm(qtext))
+
+    for clauses, query, shape in QUERY_RULES:
+        if all(tags & alts for alts in clauses):
+            return query, shape
 
     return "% TODO: add mapping rule for this question.", "N/A"
 
 
-def write_outputs(items: List[Dict]) -> None:
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    OUT_JSON.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    md = ["Question → Prolog Query Mapping\n",
-          "| QID | Question | Prolog Query | Answer shape |",
-          "|---|---|---|---|"]
-    for it in items:
-        md.append(f"| {it['qid']} | {it['question']} | `{it['prolog_query']}` | {it['answer_shape']} |")
-    OUT_MD.write_text("\n".join(md) + "\n", encoding="utf-8")
-
-    pl_lines = [
-        "% queries.pl (auto-generated)",
-        ":- initialization(main, main).",
-        "",
-        "main :-",
-        "  consult('kb/kb.pl'),",
-        "  format('Loaded KB.~n', []),",
-        "  run_all.",
-        "",
-        "run_all :-",
-    ]
-
-    var_pattern = re.compile(r"\b[A-Z][A-Za-z0-9_]*\b")
-
-    for it in items:
-        qid = it["qid"]
-        q = it["prolog_query"].strip().rstrip(".")
-        if q.strip().startswith("% TODO"):
-            pl_lines.append(f"  format('~n[{qid}] TODO mapping.~n', []),")
-            continue
-
-        vars_in_query = sorted(set(var_pattern.findall(q)))
-        var_map = {v: f"{v}_{qid}" for v in vars_in_query}
-        for v, vq in var_map.items():
-            q = re.sub(rf"\b{re.escape(v)}\b", vq, q)
-
-        answer_var = var_map[vars_in_query[0]] if vars_in_query else None
-        xs_var = f"Xs_{qid}"
-
-        pl_lines.append(f"  format('~n[{qid}] {it['question']}~n', []),")
-        if answer_var:
-            pl_lines.append(f"  ( findall({answer_var}, ({q}), {xs_var}), {xs_var} \\= []")
-            pl_lines.append(f"  -> format('  Answers: ~w~n', [{xs_var}])")
-            pl_lines.append("  ; format('  false / no answers.~n', []) ),")
-        else:
-            pl_lines.append(f"  ( call(({q})) -> format('  true.~n', []) ; format('  false / no answers.~n', []) ),")
+def dumps_json(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON, via orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2, default=asdict).encode("utf-8")
 
-    pl_lines.append("  true.")
-    OUT_PL.write_text("\n".join(pl_lines) + "\n", encoding="utf-8")
+
+def write_outputs(items: List[QueryItem]) -> None:
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    OUT_JSON.write_bytes(dumps_json(items))
+
+    with OUT_MD.open("w", encoding="utf-8") as fh:
+        fh.write("Question → Prolog Query Mapping\n\n"
+                 "| QID | Question | Prolog Query | Answer shape |\n"
+                 "|---|---|---|---|\n")
+        fh.writelines(
+            f"| {it.qid} | {it.question} | `{it.prolog_query}` | {it.answer_shape} |\n"
+            for it in items
+        )
+
+    with OUT_PL.open("w", encoding="utf-8") as fh:
+        fh.write(
+            "% queries.pl (auto-generated)\n"
+            ":- initialization(main, main).\n"
+            "\n"
+            "main :-\n"
+            "  consult('kb/kb.pl'),\n"
+            "  format('Loaded KB.~n', []),\n"
+            "  run_all.\n"
+            "\n"
+            "run_all :-\n"
+        )
+
+        for it in items:
+            qid = it.qid
+            q = it.prolog_query.strip().rstrip(".")
+            if q.strip().startswith("% TODO"):
+                fh.write(f"  format('~n[{qid}] TODO mapping.~n', []),\n")
+                continue
+
+            vars_in_query = sorted(set(_VAR_RE.findall(q)))
+            var_map = {v: f"{v}_{qid}" for v in vars_in_query}
+            q = _VAR_RE.sub(lambda m: var_map[m.group(0)], q)
+
+            answer_var = var_map[vars_in_query[0]] if vars_in_query else None
+            xs_var = f"Xs_{qid}"
+
+            fh.write(f"  format('~n[{qid}] {it.question}~n', []),\n")
+            if answer_var:
+                fh.write(f"  ( findall({answer_var}, ({q}), {xs_var}), {xs_var} \\= []\n")
+                fh.write(f"  -> format('  Answers: ~w~n', [{xs_var}])\n")
+                fh.write("  ; format('  false / no answers.~n', []) ),\n")
+            else:
+                fh.write(f"  ( call(({q})) -> format('  true.~n', []) ; format('  false / no answers.~n', []) ),\n")
+
+        fh.write("  true.\n")
 
 
 def main() -> None:
     qs = read_questions()
-    items = []
+    items: List[QueryItem] = []
     for qid, qtext in qs:
         query, shape = map_question_to_query(qtext)
-        items.append({"qid": qid, "question": qtext, "prolog_query": query, "answer_shape": shape})
+        items.append(QueryItem(qid, qtext, query, shape))
 
     write_outputs(items)
     print(f"[OK] Wrote: {OUT_JSON}")
@@ -4,28 +4,29 @@
 
 from __future__ import annotations
 
-import subprocess
-import sys
 from pathlib import Path
 
+import build_kb
+import build_vocab
+import generate_queries
+
 ROOT = Path(__file__).resolve().parent
 PROJECT_ROOT = ROOT.parent
-
-def run(cmd: list[str]) -> None:
-    print("\n$ " + " ".join(cmd))
-    subprocess.check_call(cmd, cwd=str(ROOT))
+PAR_PATH = PROJECT_ROOT / "data" / "paragraph.txt"
 
 def main() -> None:
-    run([
-        sys.executable,
-        "build_vocab.py",
-        "--paragraph",
-        str(PROJECT_ROOT / "data" / "paragraph.txt"),
-        "--outdir",
-        str(PROJECT_ROOT / "out"),
-    ])
-    run([sys.executable, "build_kb.py"])
-    run([sys.executable, "generate_queries.py"])
+    # Read the paragraph once and hand it to the stages that need it.
+    try:
+        paragraph = PAR_PATH.read_text(encoding="utf-8", errors="ignore").strip()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Missing {PAR_PATH}") from None
+
+    print("\n$ build_vocab")
+    build_vocab.main(PAR_PATH, PROJECT_ROOT / "out", paragraph_text=paragraph)
+    print("\n$ build_kb")
+    build_kb.main(paragraph)
+    print("\n$ generate_queries")
+    generate_queries.main()
     print("\n[OK] Done. See out/, kb/, results/.")
     print("If you have SWI-Prolog: swipl -q -f results/queries.pl")
 
@@ -16,21 +16,24 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Any, Callable, Optional, List, Dict, Tuple
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import csv
 import json
-import subprocess
+import sys
 from pathlib import Path
 
-# Optional: NLTK for WordNet
 try:
-    from nltk.corpus import wordnet as wn
-    import nltk
-    nltk.download('wordnet', quiet=True)
-    nltk.download('omw-1.4', quiet=True)
-    HAS_WORDNET = True
+    import orjson
+    HAS_ORJSON = True
 except ImportError:
-    HAS_WORDNET = False
-    wn = None
+    HAS_ORJSON = False
+
+# Optional: NLTK for WordNet, imported on the first /api/wsd/predict call
+wn = None
+POS_MAP: Dict[str, str] = {}  # Filled by _ensure_wn() once WordNet is imported
 
 # Paths
 ROOT = Path(__file__).parent.parent
@@ -39,10 +42,19 @@ KB_DIR = ROOT / "kb"
 RESULTS_DIR = ROOT / "results"
 DATA_DIR = ROOT / "data"
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Parse the shared data files once at startup, not on the first request."""
+    warm_caches()
+    yield
+
+
 app = FastAPI(
     title="CS229 - WSD Demo",
     description="Word Sense Disambiguation & Knowledge Representation Demo",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Static files and templates
@@ -52,27 +64,128 @@ templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
 
 # ==================== DATA LOADING ====================
 
+# (path, parser) -> (mtime_ns, parsed value)
+_FILE_CACHE: Dict[tuple, tuple] = {}
+
+
+def cached_load(path: Path, parse: Callable[[Path], Any], default: Any) -> Any:
+    """Return parse(path), re-parsing only when the file's mtime changes."""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return default
+    key = (path, parse)
+    hit = _FILE_CACHE.get(key)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    value = parse(path)
+    _FILE_CACHE[key] = (mtime, value)
+    return value
+
+
+def _parse_json(path: Path) -> dict:
+    data = path.read_bytes()
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def _parse_text(path: Path) -> str:
+    return path.read_text(encoding='utf-8')
+
+
+def _parse_prolog(path: Path) -> List[str]:
+    content = path.read_text(encoding='utf-8')
+    return [l.strip() for l in content.split('\n') if l.strip() and not l.strip().startswith('%')]
+
+
+def _parse_csv(path: Path) -> List[Dict[str, Optional[str]]]:
+    with path.open(encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        # As DictReader did: skip blank lines, fill missing cells with None
+        return [dict(zip(header, row + [None] * (len(header) - len(row))))
+                for row in reader if row]
+
+
+def _parse_queries_md(path: Path) -> List[Dict[str, str]]:
+    """Rows of the `| Qn | question | prolog | result |` table in queries.md."""
+    queries = []
+    for line in _parse_text(path).split('\n'):
+        if line.startswith('| Q'):
+            parts = line.split('|')
+            if len(parts) >= 5:
+                queries.append({
+                    "id": parts[1].strip(),
+                    "question": parts[2].strip(),
+                    "prolog": parts[3].strip(),
+                    "result": parts[4].strip() if len(parts) > 4 else ""
+                })
+    return queries
+
+
+def _parse_prolog_index(path: Path) -> Dict[str, List[str]]:
+    return index_facts(load_prolog_file(path))
+
+
+def _parse_prolog_lower(path: Path) -> List[Tuple[str, str]]:
+    return [(fact, fact.lower()) for fact in load_prolog_file(path)]
+
+
 def load_json_file(path: Path) -> dict:
-    """Load JSON file safely."""
-    if path.exists():
-        return json.loads(path.read_text(encoding='utf-8'))
-    return {}
+    """Load JSON file safely (cached until the file changes)."""
+    return cached_load(path, _parse_json, {})
 
 
 def load_text_file(path: Path) -> str:
-    """Load text file safely."""
-    if path.exists():
-        return path.read_text(encoding='utf-8')
-    return ""
+    """Load text file safely (cached until the file changes)."""
+    return cached_load(path, _parse_text, "")
+
+
+def load_csv_file(path: Path) -> List[Dict[str, Optional[str]]]:
+    """Load CSV file as a list of row dicts (cached until the file changes)."""
+    return cached_load(path, _parse_csv, [])
+
+
+def load_queries(path: Path) -> List[Dict[str, str]]:
+    """Parsed query table of queries.md (cached until the file changes)."""
+    return cached_load(path, _parse_queries_md, [])
 
 
 def load_prolog_file(path: Path) -> List[str]:
-    """Load Prolog file as list of facts."""
-    if path.exists():
-        content = path.read_text(encoding='utf-8')
-        lines = [l.strip() for l in content.split('\n') if l.strip() and not l.strip().startswith('%')]
-        return lines
-    return []
+    """Load Prolog file as list of facts (cached until the file changes)."""
+    return cached_load(path, _parse_prolog, [])
+
+
+def index_facts(facts: List[str]) -> Dict[str, List[str]]:
+    """Group Prolog facts by lowercased predicate name, keeping file order."""
+    index: Dict[str, List[str]] = defaultdict(list)
+    for fact in facts:
+        if "(" in fact:
+            index[sys.intern(fact.split("(", 1)[0].lower())].append(fact)
+    return dict(index)
+
+
+def load_prolog_index(path: Path) -> Dict[str, List[str]]:
+    """Predicate index of a Prolog file (cached until the file changes)."""
+    return cached_load(path, _parse_prolog_index, {})
+
+
+def load_prolog_lower(path: Path) -> List[Tuple[str, str]]:
+    """(fact, lowercased fact) pairs of a Prolog file (cached until the file changes)."""
+    return cached_load(path, _parse_prolog_lower, [])
+
+
+def warm_caches() -> None:
+    """Populate the file caches that every request reads from."""
+    load_text_file(DATA_DIR / "paragraph.txt")
+    load_prolog_index(KB_DIR / "kb.pl")
+    load_prolog_lower(KB_DIR / "kb.pl")
+    load_prolog_index(KB_DIR / "kb_aug.pl")
+    load_text_file(KB_DIR / "kb_fol.md")
+    load_csv_file(WSD_DIR / "data" / "reference_annotations.csv")
+    load_queries(RESULTS_DIR / "queries.md")
+    load_text_file(RESULTS_DIR / "queries.pl")
+    for name in ("mfs_eval.json", "bert_eval.json", "predictions_mfs.json", "predictions_bert_semcor.json"):
+        load_json_file(WSD_DIR / "results" / name)
 
 
 # ==================== API MODELS ====================
@@ -87,6 +200,11 @@ class QueryRequest(BaseModel):
     query: str
 
 
+# Predicates that are also looked up in the augmented KB
+AUG_PREDICATES = frozenset({"synonym", "is_a"})
+AUG_RESULT_LIMIT = 20  # Limit for display
+
+
 # ==================== API ENDPOINTS ====================
 
 @app.get("/", response_class=HTMLResponse)
@@ -112,16 +230,8 @@ async def get_questions():
 @app.get("/api/annotations")
 async def get_annotations():
     """Get reference annotations."""
-    path = WSD_DIR / "data" / "reference_annotations.csv"
-    if path.exists():
-        import csv
-        annotations = []
-        with path.open(encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                annotations.append(row)
-        return {"annotations": annotations, "total": len(annotations)}
-    return {"annotations": [], "total": 0}
+    annotations = load_csv_file(WSD_DIR / "data" / "reference_annotations.csv")
+    return {"annotations": annotations, "total": len(annotations)}
 
 
 @app.get("/api/wsd/results")
@@ -147,18 +257,41 @@ async def get_wsd_results():
     }
 
 
+def _ensure_wn() -> bool:
+    """Import WordNet lazily; download the data only if it is missing."""
+    global wn
+    if wn is not None:
+        return True
+    try:
+        import nltk
+        from nltk.corpus import wordnet
+    except ImportError:
+        return False
+    try:
+        wordnet.synsets('dog')
+    except LookupError:
+        nltk.download('wordnet', quiet=True)
+        nltk.download('omw-1.4', quiet=True)
+    wn = wordnet
+    POS_MAP.update({
+        'n': wn.NOUN, 'v': wn.VERB, 'a': wn.ADJ, 's': wn.ADJ, 'r': wn.ADV,
+    })
+    return True
+
+
 @app.post("/api/wsd/predict")
 async def wsd_predict(req: WSDRequest):
     """Predict word sense using MFS."""
-    if not HAS_WORDNET:
+    if not _ensure_wn():
         raise HTTPException(status_code=500, detail="WordNet not available")
     
-    word = req.word.lower()
-    pos = req.pos.lower()
-    
-    # Map POS
-    pos_map = {'n': wn.NOUN, 'v': wn.VERB, 'a': wn.ADJ, 'r': wn.ADV}
-    wn_pos = pos_map.get(pos)
+    return lookup_senses(req.word.lower(), req.pos.lower())
+
+
+@lru_cache(maxsize=4096)
+def lookup_senses(word: str, pos: str) -> dict:
+    """WordNet senses for a (word, pos) pair, memoized across requests."""
+    wn_pos = POS_MAP.get(pos)
     
     # Get synsets
     synsets = wn.synsets(word, pos=wn_pos) if wn_pos else wn.synsets(word)
@@ -204,26 +337,9 @@ async def get_knowledge_base():
 @app.get("/api/queries")
 async def get_queries():
     """Get predefined queries."""
-    queries_md = load_text_file(RESULTS_DIR / "queries.md")
-    queries_pl = load_text_file(RESULTS_DIR / "queries.pl")
-    
-    # Parse queries from markdown
-    queries = []
-    lines = queries_md.split('\n')
-    for line in lines:
-        if line.startswith('| Q'):
-            parts = line.split('|')
-            if len(parts) >= 5:
-                queries.append({
-                    "id": parts[1].strip(),
-                    "question": parts[2].strip(),
-                    "prolog": parts[3].strip(),
-                    "result": parts[4].strip() if len(parts) > 4 else ""
-                })
-    
     return {
-        "queries": queries,
-        "prolog_code": queries_pl
+        "queries": load_queries(RESULTS_DIR / "queries.md"),
+        "prolog_code": load_text_file(RESULTS_DIR / "queries.pl")
     }
 
 
@@ -242,8 +358,7 @@ async def execute_query(req: QueryRequest):
     query = req.query.strip()
     query_lower = query.lower()
     
-    kb_facts = load_prolog_file(KB_DIR / "kb.pl")
-    kb_aug = load_prolog_file(KB_DIR / "kb_aug.pl")
+    kb_index = load_prolog_index(KB_DIR / "kb.pl")
     
     results = []
     
@@ -256,31 +371,25 @@ async def execute_query(req: QueryRequest):
         predicate = query_lower.strip()
     
     # Search in main KB - exact predicate matching
-    for fact in kb_facts:
-        fact_lower = fact.lower()
-        # Check if fact starts with the predicate name followed by (
-        if fact_lower.startswith(f"{predicate}("):
-            results.append(fact)
+    results.extend(kb_index.get(predicate, []))
     
     # If searching for synonym or is_a, also search in augmented KB
-    if predicate in ["synonym", "is_a"]:
-        for fact in kb_aug:
-            fact_lower = fact.lower()
-            if fact_lower.startswith(f"{predicate}("):
-                results.append(fact)
-                if len(results) >= 20:  # Limit for display
-                    break
+    if predicate in AUG_PREDICATES:
+        kb_aug_index = load_prolog_index(KB_DIR / "kb_aug.pl")
+        # At least one augmented fact, then fill up to the display limit
+        results.extend(kb_aug_index.get(predicate, [])[:max(1, AUG_RESULT_LIMIT - len(results))])
     
     # If no results with exact match, try fuzzy search on arguments
     if not results and "(" in query_lower:
         # Extract arguments and search
         args_part = query_lower.split("(")[1].rstrip(")")
         args = [a.strip() for a in args_part.split(",")]
+        needles = [arg for arg in args if arg and arg != "x"]
         
-        for fact in kb_facts:
-            fact_lower = fact.lower()
-            if all(arg in fact_lower for arg in args if arg and arg != "x"):
-                results.append(fact)
+        results = [
+            fact for fact, fact_lower in load_prolog_lower(KB_DIR / "kb.pl")
+            if all(arg in fact_lower for arg in needles)
+        ]
     
     return {
         "query": req.query,
@@ -12,30 +12,48 @@ from __future__ import annotations
 
 import csv
 import json
+import re
+import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Sequence, Tuple
 
+import numpy as np
 from nltk.corpus import wordnet as wn
 from sklearn.metrics import precision_score, recall_score, f1_score
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Paths - updated for new folder structure
 SCRIPT_DIR = Path(__file__).parent
 REF_PATH = SCRIPT_DIR / "data" / "reference_annotations.csv"
 OUT_PATH = SCRIPT_DIR / "results" / "mfs_eval.json"
 PREDICTIONS_OUT = SCRIPT_DIR / "results" / "predictions_mfs.json"
 
+# lemma.pos.NN (any further dotted parts are ignored); the sense number
+# accepts whatever int() does: surrounding whitespace, a sign, underscores
+SYNSET_RE = re.compile(r"([^.]*)\.([^.]*)\.\s*([+-]?\d+(?:_\d+)*)\s*(?:\.|$)")
+POS_MAP = {
+    'n': wn.NOUN, 'v': wn.VERB, 'a': wn.ADJ, 's': wn.ADJ, 'r': wn.ADV,
+}
+
 
 def mfs_predict(lemma: str, pos: str) -> Optional[str]:
     """
     Most Frequent Sense baseline.
     Returns first synset from WordNet (most common sense).
     """
-    pos_map = {
-        'n': wn.NOUN, 'v': wn.VERB, 'a': wn.ADJ, 's': wn.ADJ, 'r': wn.ADV,
-    }
-    
-    wn_pos = pos_map.get(pos.lower())
-    synsets = wn.synsets(lemma.lower(), pos=wn_pos) if wn_pos else wn.synsets(lemma.lower())
+    return _first_synset(lemma.lower(), pos.lower())
+
+
+@lru_cache(maxsize=None)
+def _first_synset(lemma: str, pos: str) -> Optional[str]:
+    wn_pos = POS_MAP.get(pos)
+    synsets = wn.synsets(lemma, pos=wn_pos) if wn_pos else wn.synsets(lemma)
     
     if synsets:
         return synsets[0].name()
@@ -43,35 +61,69 @@ def mfs_predict(lemma: str, pos: str) -> Optional[str]:
 
 
 def normalize_synset(synset_name: str) -> str:
-    """Normalize synset name for comparison."""
+    """Normalize synset name for comparison (interned: rows share one object)."""
     if not synset_name:
         return ""
-    parts = synset_name.split('.')
-    if len(parts) >= 3:
-        try:
-            return f"{parts[0]}.{parts[1]}.{int(parts[2]):02d}"
-        except:
-            return synset_name.lower()
-    return synset_name.lower()
+    m = SYNSET_RE.match(synset_name)
+    if m:
+        return sys.intern("%s.%s.%02d" % (m[1], m[2], int(m[3])))
+    return sys.intern(synset_name.lower())
+
+
+def normalize_column(names) -> np.ndarray:
+    """normalize_synset over a column of names, as a NumPy string array."""
+    return np.asarray([normalize_synset(name or "") for name in names], dtype=str)
 
 
-def calculate_metrics(y_true: List[str], y_pred: List[str]) -> dict:
+def calculate_metrics(y_true: Sequence[str], y_pred: Sequence[str]) -> dict:
     """Calculate precision, recall, F1 metrics."""
     # Filter out empty predictions
-    valid_indices = [i for i in range(len(y_true)) if y_true[i] and y_pred[i]]
-    y_true_valid = [y_true[i] for i in valid_indices]
-    y_pred_valid = [y_pred[i] for i in valid_indices]
+    yt = np.asarray(y_true, dtype=str)
+    yp = np.asarray(y_pred, dtype=str)
+    mask = (yt != "") & (yp != "")
+    yt, yp = yt[mask], yp[mask]
     
-    if not y_true_valid:
+    if not yt.size:
         return {"precision_macro": 0, "recall_macro": 0, "f1_weighted": 0}
     
+    # Same label set sklearn would infer, computed once for all three metrics
+    labels = np.union1d(yt, yp)
     return {
-        "precision_macro": round(precision_score(y_true_valid, y_pred_valid, average='macro', zero_division=0), 4),
-        "recall_macro": round(recall_score(y_true_valid, y_pred_valid, average='macro', zero_division=0), 4),
-        "f1_weighted": round(f1_score(y_true_valid, y_pred_valid, average='weighted', zero_division=0), 4),
+        "precision_macro": round(float(precision_score(yt, yp, labels=labels, average='macro', zero_division=0)), 4),
+        "recall_macro": round(float(recall_score(yt, yp, labels=labels, average='macro', zero_division=0)), 4),
+        "f1_weighted": round(float(f1_score(yt, yp, labels=labels, average='weighted', zero_division=0)), 4),
     }
 
 
+def dumps_json(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON, via orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def load_annotations(path: Path) -> Tuple[List[str], List[str], List[str]]:
+    """Load reference annotations column-wise as (lemmas, poss, refs)."""
+    lemmas: List[str] = []
+    poss: List[str] = []
+    refs: List[str] = []
+    with path.open(encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        li, pi, si = header.index('lemma'), header.index('pos'), header.index('synset')
+        width = max(li, pi, si) + 1
+        for row in reader:
+            # As DictReader did: skip blank lines, treat missing cells as empty
+            if not row:
+                continue
+            if len(row) < width:
+                row += [""] * (width - len(row))
+            lemmas.append(row[li])
+            poss.append(row[pi])
+            refs.append(row[si])
+    return lemmas, poss, refs
+
+
 def main() -> None:
     if not REF_PATH.exists():
         raise FileNotFoundError(f"Missing {REF_PATH}. Please ensure reference_annotations.csv exists.")
@@ -79,53 +131,35 @@ def main() -> None:
     print(f"[INFO] Loading reference from: {REF_PATH}")
     
     # Load reference annotations
-    annotations = []
-    with REF_PATH.open(encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            annotations.append({
-                'lemma': row['lemma'],
-                'pos': row['pos'],
-                'reference': row['synset'],
-            })
+    lemmas, poss, refs = load_annotations(REF_PATH)
     
-    print(f"[INFO] Loaded {len(annotations)} annotations")
+    print(f"[INFO] Loaded {len(refs)} annotations")
     
     # Run MFS predictions
-    predictions = []
-    y_true = []
-    y_pred = []
-    correct = 0
-    total = 0
+    mfs_preds = [mfs_predict(lemma, pos) for lemma, pos in zip(lemmas, poss)]
+    
+    # Normalize each column once, then compare whole arrays
+    ref_norms = normalize_column(refs)
+    mfs_norms = normalize_column(mfs_preds)
+    has_ref = ref_norms != ""
+    matches = has_ref & (mfs_norms != "") & (ref_norms == mfs_norms)
+    
+    total = int(has_ref.sum())
+    correct = int(matches.sum())
+    y_true = ref_norms[has_ref]
+    y_pred = mfs_norms[has_ref]
     
-    for ann in annotations:
-        lemma = ann['lemma']
-        pos = ann['pos']
-        reference = ann['reference']
-        
-        # MFS prediction
-        mfs_pred = mfs_predict(lemma, pos)
-        
-        # Normalize for comparison
-        ref_norm = normalize_synset(reference)
-        mfs_norm = normalize_synset(mfs_pred or "")
-        
-        match = (ref_norm == mfs_norm) if ref_norm and mfs_norm else False
-        
-        if ref_norm:
-            total += 1
-            y_true.append(ref_norm)
-            y_pred.append(mfs_norm)
-            if match:
-                correct += 1
-        
-        predictions.append({
+    predictions = [
+        {
             'lemma': lemma,
             'pos': pos,
             'reference': reference,
             'mfs': mfs_pred,
             'match': match
-        })
+        }
+        for lemma, pos, reference, mfs_pred, match
+        in zip(lemmas, poss, refs, mfs_preds, matches.tolist())
+    ]
     
     acc = correct / total if total else 0.0
     metrics = calculate_metrics(y_true, y_pred)
@@ -144,11 +178,8 @@ def main() -> None:
     }
     
     OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    OUT_PATH.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
-    PREDICTIONS_OUT.write_text(
-        json.dumps({"predictions": predictions}, indent=2, ensure_ascii=False), 
-        encoding="utf-8"
-    )
+    OUT_PATH.write_bytes(dumps_json(results))
+    PREDICTIONS_OUT.write_bytes(dumps_json({"predictions": predictions}))
     
     print(f"\n[RESULTS]")
     print(f"  Dataset: reference_annotations.csv ({total} tokens)")
@@ -12,8 +12,11 @@ from __future__ import annotations
 
 import csv
 import json
+import re
+import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Sequence, Tuple
 
 import torch
 import numpy as np
@@ -22,6 +25,12 @@ from transformers import AutoTokenizer, AutoModel
 from nltk.corpus import wordnet as wn
 from sklearn.metrics import precision_score, recall_score, f1_score
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Paths
 SCRIPT_DIR = Path(__file__).parent
 REF_PATH = SCRIPT_DIR / "data" / "reference_annotations.csv"
@@ -30,6 +39,11 @@ MODEL_PATH = SCRIPT_DIR / "models" / "bert_semcor_model.pkl"
 EVAL_OUT = SCRIPT_DIR / "results" / "bert_eval.json"
 PREDICTIONS_OUT = SCRIPT_DIR / "results" / "predictions_bert_semcor.json"
 
+# lemma.pos.NN (any further dotted parts are ignored); the sense number
+# accepts whatever int() does: surrounding whitespace, a sign, underscores
+SYNSET_RE = re.compile(r"([^.]*)\.([^.]*)\.\s*([+-]?\d+(?:_\d+)*)\s*(?:\.|$)")
+POS_MAP = {'n': wn.NOUN, 'v': wn.VERB, 'a': wn.ADJ, 's': wn.ADJ, 'r': wn.ADV}
+
 
 def get_device():
     if torch.cuda.is_available():
@@ -39,54 +53,96 @@ def get_device():
     return torch.device("cpu")
 
 
-def get_bert_embedding(text: str, tokenizer, model, device) -> np.ndarray:
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
+def get_bert_embeddings(texts: List[str], tokenizer, model, device) -> np.ndarray:
+    """CLS embeddings for a batch of texts, shape (len(texts), hidden_size)."""
+    inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True, max_length=128)
     inputs = {k: v.to(device) for k, v in inputs.items()}
     
-    with torch.no_grad():
+    # fp16 autocast on CUDA; classifiers still receive float32 features
+    with torch.inference_mode(), torch.autocast(
+        device_type=device.type, dtype=torch.float16, enabled=device.type == "cuda"
+    ):
         outputs = model(**inputs)
-        embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()[0]
+        embeddings = outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
     
-    return embedding
+    return embeddings
 
 
 def mfs_predict(lemma: str, pos: str) -> Optional[str]:
     """MFS fallback - WordNet first synset."""
-    pos_map = {'n': wn.NOUN, 'v': wn.VERB, 'a': wn.ADJ, 's': wn.ADJ, 'r': wn.ADV}
-    wn_pos = pos_map.get(pos.lower())
-    synsets = wn.synsets(lemma.lower(), pos=wn_pos) if wn_pos else wn.synsets(lemma.lower())
+    return _first_synset(lemma.lower(), pos.lower())
+
+
+@lru_cache(maxsize=None)
+def _first_synset(lemma: str, pos: str) -> Optional[str]:
+    wn_pos = POS_MAP.get(pos)
+    synsets = wn.synsets(lemma, pos=wn_pos) if wn_pos else wn.synsets(lemma)
     return synsets[0].name() if synsets else None
 
 
 def normalize_synset(synset_name: str) -> str:
-    """Normalize synset name for comparison."""
+    """Normalize synset name for comparison (interned: rows share one object)."""
     if not synset_name:
         return ""
-    parts = synset_name.split('.')
-    if len(parts) >= 3:
-        try:
-            return f"{parts[0]}.{parts[1]}.{int(parts[2]):02d}"
-        except:
-            return synset_name.lower()
-    return synset_name.lower()
+    m = SYNSET_RE.match(synset_name)
+    if m:
+        return sys.intern("%s.%s.%02d" % (m[1], m[2], int(m[3])))
+    return sys.intern(synset_name.lower())
+
+
+def normalize_column(names) -> np.ndarray:
+    """normalize_synset over a column of names, as a NumPy string array."""
+    return np.asarray([normalize_synset(name or "") for name in names], dtype=str)
 
 
-def calculate_metrics(y_true: List[str], y_pred: List[str]) -> dict:
+def calculate_metrics(y_true: Sequence[str], y_pred: Sequence[str]) -> dict:
     """Calculate precision, recall, F1 metrics."""
-    valid_indices = [i for i in range(len(y_true)) if y_true[i] and y_pred[i]]
-    y_true_valid = [y_true[i] for i in valid_indices]
-    y_pred_valid = [y_pred[i] for i in valid_indices]
+    yt = np.asarray(y_true, dtype=str)
+    yp = np.asarray(y_pred, dtype=str)
+    mask = (yt != "") & (yp != "")
+    yt, yp = yt[mask], yp[mask]
     
-    if not y_true_valid:
+    if not yt.size:
         return {"precision_macro": 0, "recall_macro": 0, "f1_weighted": 0}
     
+    # Same label set sklearn would infer, computed once for all three metrics
+    labels = np.union1d(yt, yp)
     return {
-        "precision_macro": round(precision_score(y_true_valid, y_pred_valid, average='macro', zero_division=0), 4),
-        "recall_macro": round(recall_score(y_true_valid, y_pred_valid, average='macro', zero_division=0), 4),
-        "f1_weighted": round(f1_score(y_true_valid, y_pred_valid, average='weighted', zero_division=0), 4),
+        "precision_macro": round(float(precision_score(yt, yp, labels=labels, average='macro', zero_division=0)), 4),
+        "recall_macro": round(float(recall_score(yt, yp, labels=labels, average='macro', zero_division=0)), 4),
+        "f1_weighted": round(float(f1_score(yt, yp, labels=labels, average='weighted', zero_division=0)), 4),
     }
 
 
+def dumps_json(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON, via orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def load_annotations(path: Path) -> Tuple[List[str], List[str], List[str]]:
+    """Load reference annotations column-wise as (lemmas, poss, refs)."""
+    lemmas: List[str] = []
+    poss: List[str] = []
+    refs: List[str] = []
+    with path.open(encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        li, pi, si = header.index('lemma'), header.index('pos'), header.index('synset')
+        width = max(li, pi, si) + 1
+        for row in reader:
+            # As DictReader did: skip blank lines, treat missing cells as empty
+            if not row:
+                continue
+            if len(row) < width:
+                row += [""] * (width - len(row))
+            lemmas.append(row[li])
+            poss.append(row[pi])
+            refs.append(row[si])
+    return lemmas, poss, refs
+
+
 def main() -> None:
     print("[INFO] BERT + SVM WSD Evaluation")
     print("=" * 60)
@@ -121,70 +177,56 @@ def main() -> None:
         print(f"[INFO] Loaded paragraph ({len(paragraph)} chars)")
     
     # Load reference annotations
-    annotations = []
-    with REF_PATH.open(encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            annotations.append({
-                'lemma': row['lemma'],
-                'pos': row['pos'],
-                'reference': row['synset'],
-            })
+    lemmas, poss, refs = load_annotations(REF_PATH)
     
-    print(f"[INFO] Loaded {len(annotations)} annotations")
+    print(f"[INFO] Loaded {len(refs)} annotations")
     print("\n[INFO] Running predictions...")
     
     # Get embedding for paragraph context
-    context_emb = get_bert_embedding(paragraph[:500], tokenizer, bert_model, device)
+    context_batch = get_bert_embeddings([paragraph[:500]], tokenizer, bert_model, device)
+    
+    # Every annotation shares the paragraph embedding, so each per-lemma
+    # classifier only needs to run once per distinct lemma::pos key.
+    keys = {f"{lemma}::{pos}" for lemma, pos in zip(lemmas, poss)}
+    model_preds = {
+        key: models[key]["classifier"].predict(context_batch)[0]
+        for key in keys if key in models
+    }
     
     # Run predictions
-    predictions = []
-    y_true = []
-    y_pred = []
-    correct = 0
-    correct_mfs = 0
-    total = 0
-    covered = 0
-    
-    for i, ann in enumerate(annotations):
-        lemma = ann['lemma']
-        pos = ann['pos']
-        reference = ann['reference']
+    mfs_preds = []
+    row_preds = []
+    has_models = []
+    
+    for lemma, pos in zip(lemmas, poss):
         key = f"{lemma}::{pos}"
         
         # MFS fallback
         mfs_pred = mfs_predict(lemma, pos)
         
         # BERT model prediction
-        model_pred = None
-        has_model = False
-        
-        if key in models:
-            has_model = True
-            covered += 1
-            clf = models[key]["classifier"]
-            model_pred = clf.predict([context_emb])[0]
-        else:
-            model_pred = mfs_pred  # Fallback to MFS
-        
-        # Normalize for comparison
-        ref_norm = normalize_synset(reference)
-        pred_norm = normalize_synset(model_pred or "")
-        mfs_norm = normalize_synset(mfs_pred or "")
-        
-        match = (ref_norm == pred_norm) if ref_norm and pred_norm else False
-        mfs_match = (ref_norm == mfs_norm) if ref_norm and mfs_norm else False
-        
-        if ref_norm:
-            total += 1
-            y_true.append(ref_norm)
-            y_pred.append(pred_norm)
-            if match:
-                correct += 1
-            if mfs_match:
-                correct_mfs += 1
-        
-        predictions.append({
+        has_model = key in model_preds
+        mfs_preds.append(mfs_pred)
+        row_preds.append(model_preds[key] if has_model else mfs_pred)  # Fallback to MFS
+        has_models.append(has_model)
+    
+    # Normalize each column once, then compare whole arrays
+    ref_norms = normalize_column(refs)
+    pred_norms = normalize_column(row_preds)
+    mfs_norms = normalize_column(mfs_preds)
+    has_ref = ref_norms != ""
+    matches = has_ref & (pred_norms != "") & (ref_norms == pred_norms)
+    mfs_matches = has_ref & (mfs_norms != "") & (ref_norms == mfs_norms)
+    
+    total = int(has_ref.sum())
+    correct = int(matches.sum())
+    correct_mfs = int(mfs_matches.sum())
+    covered = sum(has_models)
+    y_true = ref_norms[has_ref]
+    y_pred = pred_norms[has_ref]
+    
+    predictions = [
+        {
             'lemma': lemma,
             'pos': pos,
             'reference': reference,
@@ -193,10 +235,11 @@ def main() -> None:
             'has_model': has_model,
             'match': match,
             'mfs_match': mfs_match
-        })
-        
-        if (i + 1) % 20 == 0:
-            print(f"  Processed {i + 1}/{len(annotations)}")
+        }
+        for lemma, pos, reference, model_pred, mfs_pred, has_model, match, mfs_match
+        in zip(lemmas, poss, refs, row_preds, mfs_preds, has_models,
+               matches.tolist(), mfs_matches.tolist())
+    ]
     
     acc = correct / total if total else 0.0
     mfs_acc = correct_mfs / total if total else 0.0
@@ -217,15 +260,12 @@ def main() -> None:
     }
     
     EVAL_OUT.parent.mkdir(parents=True, exist_ok=True)
-    EVAL_OUT.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
-    PREDICTIONS_OUT.write_text(
-        json.dumps({
-            "model_name": tokenizer_name,
-            "method": "BERT + SVM trained on SemCor",
-            "predictions": predictions
-        }, indent=2, ensure_ascii=False),
-        encoding="utf-8"
-    )
+    EVAL_OUT.write_bytes(dumps_json(results))
+    PREDICTIONS_OUT.write_bytes(dumps_json({
+        "model_name": tokenizer_name,
+        "method": "BERT + SVM trained on SemCor",
+        "predictions": predictions
+    }))
     
     print(f"\n{'='*60}")
     print("RESULTS - BERT + SVM")
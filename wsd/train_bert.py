@@ -11,10 +11,16 @@ Output: models/bert_semcor_model.pkl
 
 from __future__ import annotations
 
+import argparse
+import hashlib
+import importlib.util
 import json
+import os
 import random
+import tempfile
 from pathlib import Path
 from collections import defaultdict
+from typing import Dict, List, Optional
 
 import torch
 from transformers import AutoTokenizer, AutoModel
@@ -23,14 +29,22 @@ from sklearn.metrics import accuracy_score
 import numpy as np
 import joblib
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Paths - updated for new folder structure
 SCRIPT_DIR = Path(__file__).parent
 SEMCOR_PATH = SCRIPT_DIR / "data" / "semcor_instances.jsonl"
 MODEL_OUT = SCRIPT_DIR / "models" / "bert_semcor_model.pkl"
 EVAL_OUT = SCRIPT_DIR / "results" / "bert_semcor_train_eval.json"
+CACHE_DIR = SCRIPT_DIR / "cache"
 
 BERT_MODEL = "bert-base-uncased"
 MAX_INSTANCES_PER_LEMMA = 500  # Limit to avoid memory issues
+MAX_BATCH_TOKENS = 128 * 128  # Padded tokens per BERT forward pass
 
 
 def get_device():
@@ -44,111 +58,254 @@ def get_device():
     return torch.device("cpu")
 
 
+def loads_json(data: bytes):
+    """Parse JSON from raw bytes, via orjson when available."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_json(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON, via orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def can_compile(device) -> bool:
+    """torch.compile's Inductor backend needs Triton and a CUDA GPU of compute capability 7.0+."""
+    if device.type != "cuda" or importlib.util.find_spec("triton") is None:
+        return False
+    return torch.cuda.get_device_capability(device) >= (7, 0)
+
+
+def instance_context(inst: dict) -> str:
+    """Context string fed to BERT for one SemCor instance."""
+    ctx = inst.get('context', [])
+    if isinstance(ctx, list):
+        return ' '.join(ctx[:50])  # Limit context length
+    return str(ctx)[:500]
+
+
 def load_semcor_data(semcor_path: Path, max_per_lemma=500):
-    """Load SemCor instances, grouped by lemma::pos."""
+    """
+    Load SemCor instances as (context, label) pairs, grouped by lemma::pos.
+    The raw JSON records are dropped as soon as their context is built.
+    """
     print(f"[INFO] Loading SemCor data from: {semcor_path}")
     grouped = defaultdict(list)
     
-    with semcor_path.open(encoding="utf-8") as f:
+    # Raw bytes go straight to the JSON parser, skipping str decoding;
+    # isspace() checks for blank lines without allocating a stripped copy
+    with semcor_path.open("rb", buffering=1 << 16) as f:
         for line in f:
-            inst = json.loads(line)
+            if line.isspace():
+                continue
+            inst = loads_json(line)
             key = f"{inst['lemma']}::{inst['pos']}"
             
             # Limit instances per lemma
             if len(grouped[key]) < max_per_lemma:
-                grouped[key].append(inst)
+                grouped[key].append((instance_context(inst), inst['label']))
     
     print(f"[INFO] Loaded data for {len(grouped)} lemma::pos combinations")
     return grouped
 
 
-def get_bert_embedding(text: str, tokenizer, model, device) -> np.ndarray:
-    """Get BERT embedding."""
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
-    inputs = {k: v.to(device) for k, v in inputs.items()}
+def length_buckets(lengths: np.ndarray, max_tokens: int = MAX_BATCH_TOKENS) -> List[np.ndarray]:
+    """
+    Split indices, sorted by length, into batches of at most max_tokens
+    padded tokens, so short texts share large batches and long ones small.
+    """
+    order = np.argsort(lengths, kind="stable")
+    buckets = []
+    start = 0
+    for stop in range(1, len(order) + 1):
+        # Ascending order: the next row would set the padded length
+        if stop == len(order) or (stop - start + 1) * lengths[order[stop]] > max_tokens:
+            buckets.append(order[start:stop])
+            start = stop
+    return buckets
+
+
+def get_bert_embeddings(texts: List[str], tokenizer, model, device,
+                        max_tokens: int = MAX_BATCH_TOKENS) -> np.ndarray:
+    """CLS embeddings for texts, shape (len(texts), hidden_size), in input order."""
+    embeddings = np.empty((len(texts), model.config.hidden_size), dtype=np.float32)
+    if not texts:
+        return embeddings
+    
+    # Tokenize once, in a single fast-tokenizer call, keeping only the ids;
+    # tokenizer.pad rebuilds the attention mask per batch
+    input_ids = tokenizer(texts, truncation=True, max_length=128,
+                          return_attention_mask=False, return_token_type_ids=False)["input_ids"]
+    lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(texts))
+    lengths = (lengths + 7) // 8 * 8  # Batches are padded to a multiple of 8
+    
+    # fp16 autocast on CUDA, as in predict_and_eval, so training and
+    # evaluation features come from the same forward pass
+    with torch.inference_mode(), torch.autocast(
+        device_type=device.type, dtype=torch.float16, enabled=device.type == "cuda"
+    ):
+        for idx in length_buckets(lengths, max_tokens):
+            batch = tokenizer.pad({"input_ids": [input_ids[j] for j in idx]},
+                                  pad_to_multiple_of=8, return_tensors="pt")
+            inputs = {k: v.to(device) for k, v in batch.items()}
+            outputs = model(**inputs)
+            embeddings[idx] = outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
+    
+    return embeddings
+
+
+def embedding_cache_path(semcor_path: Path, device: torch.device) -> Path:
+    """Embedding cache file for this SemCor file version, model, instance limit
+    and forward precision (fp16 autocast on CUDA, fp32 elsewhere)."""
+    st = semcor_path.stat()
+    precision = "fp16" if device.type == "cuda" else "fp32"
+    key = (f"unique-contexts:{BERT_MODEL}:{MAX_INSTANCES_PER_LEMMA}:{precision}:"
+           f"{st.st_mtime_ns}:{st.st_size}")
+    return CACHE_DIR / f"bert_cls.{hashlib.sha1(key.encode()).hexdigest()[:16]}.npy"
+
+
+def save_npy_atomic(path: Path, array: np.ndarray) -> None:
+    """np.save via a temp file in the same directory, then os.replace, so an
+    interrupted write never leaves a truncated .npy at `path`."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        # mkstemp creates the file 0600; use the mode a plain open() would
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o666 & ~umask)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_or_embed(texts: List[str], tokenizer, model, device,
+                  cache_path: Optional[Path] = None) -> np.ndarray:
+    """get_bert_embeddings, reusing a saved .npy (memory-mapped) when one matches."""
+    if cache_path is not None:
+        try:
+            cached = np.load(cache_path, mmap_mode="r")
+        except FileNotFoundError:
+            cached = None
+        except (OSError, ValueError) as e:
+            # Unreadable cache: recompute and overwrite it
+            print(f"[WARN] Ignoring unreadable embedding cache {cache_path}: {e}")
+            cached = None
+        if cached is not None and cached.shape[0] == len(texts):
+            print(f"[INFO] Using cached embeddings: {cache_path}")
+            return cached
+    
+    embeddings = get_bert_embeddings(texts, tokenizer, model, device)
+    if cache_path is not None:
+        save_npy_atomic(cache_path, embeddings)
+    return embeddings
+
+
+def fit_lemma_model(key: str, X_train, y_train, X_test, y_test, eval_train: bool = False):
+    """
+    Fit and score one lemma's SVM. Returns (key, model entry or None).
+    Training accuracy costs a second predict over X_train, so it is only
+    computed when eval_train is set (otherwise None).
+    """
+    # Check train set has multiple classes
+    if len(set(y_train)) < 2:
+        return key, None
     
-    with torch.no_grad():
-        outputs = model(**inputs)
-        embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()[0]
+    try:
+        clf = LinearSVC(random_state=42, max_iter=1000)
+        clf.fit(X_train, y_train)
+    except Exception as e:
+        print(f"  Warning: Failed to train {key}: {e}")
+        return key, None  # Skip if training fails
     
-    return embedding
+    # Evaluate
+    train_acc = accuracy_score(y_train, clf.predict(X_train)) if eval_train else None
+    test_acc = accuracy_score(y_test, clf.predict(X_test)) if len(X_test) > 0 else 0.0
+    
+    return key, {
+        "classifier": clf,
+        "n_train": len(X_train),
+        "n_test": len(X_test),
+        "train_acc": train_acc,
+        "test_acc": test_acc
+    }
 
 
-def train_per_lemma_models(grouped_data, tokenizer, model, device):
+def train_per_lemma_models(grouped_data, tokenizer, model, device,
+                           cache_path: Optional[Path] = None, eval_train: bool = False):
     """Train SVM for each lemma::pos with enough data."""
-    models = {}
+    # Need at least 10 instances and more than one class; checking this
+    # before embedding avoids BERT passes for lemmas that are skipped anyway
+    trainable = [
+        (key, instances) for key, instances in grouped_data.items()
+        if len(instances) >= 10 and len({label for _, label in instances}) >= 2
+    ]
+    
+    # A sentence hosts several labeled words, so many instances share a
+    # context: embed each distinct context once and gather rows per instance
+    unique_rows: Dict[str, int] = {}
+    rows = np.fromiter(
+        (unique_rows.setdefault(context, len(unique_rows))
+         for _, instances in trainable for context, _ in instances),
+        dtype=np.intp,
+    )
+    print(f"[INFO] Embedding {len(unique_rows)} unique contexts ({len(rows)} instances)...")
+    embeddings = load_or_embed(list(unique_rows), tokenizer, model, device, cache_path)
+    
+    def iter_jobs():
+        # joblib pulls jobs from this generator in order and only a few
+        # ahead of the workers, so the shuffle sequence is fixed and only
+        # the in-flight lemmas' splits are held in memory
+        offset = 0
+        for key, instances in trainable:
+            # Prepare data: this lemma's rows of the shared embedding matrix
+            X = embeddings[rows[offset:offset + len(instances)]]
+            offset += len(instances)
+            y = [label for _, label in instances]
+            
+            # Train/test split
+            n_train = int(0.8 * len(X))
+            indices = list(range(len(X)))
+            random.shuffle(indices)
+            
+            train_idx = indices[:n_train]
+            test_idx = indices[n_train:]
+            
+            X_train, y_train = X[train_idx], [y[i] for i in train_idx]
+            X_test, y_test = X[test_idx], [y[i] for i in test_idx]
+            
+            yield joblib.delayed(fit_lemma_model)(key, X_train, y_train, X_test, y_test, eval_train)
     
     print("[INFO] Training per-lemma models...")
-    total = len(grouped_data)
+    total = len(trainable)
+    models = {}
     
-    for i, (key, instances) in enumerate(grouped_data.items()):
-        if len(instances) < 10:  # Need at least 10 instances
-            continue
-        
+    # The independent fits run on all cores; results come back in order
+    results = joblib.Parallel(n_jobs=-1, return_as="generator")(iter_jobs())
+    for i, (key, entry) in enumerate(results):
         if i % 100 == 0:
             print(f"  Processing {i}/{total}: {key}")
-        
-        # Prepare data
-        X = []
-        y = []
-        
-        for inst in instances:
-            ctx = inst.get('context', [])
-            if isinstance(ctx, list):
-                context = ' '.join(ctx[:50])  # Limit context length
-            else:
-                context = str(ctx)[:500]
-            emb = get_bert_embedding(context, tokenizer, model, device)
-            X.append(emb)
-            y.append(inst['label'])
-        
-        X = np.array(X)
-        
-        # Check if we have multiple classes
-        unique_labels = set(y)
-        if len(unique_labels) < 2:
-            continue  # Skip if only one class
-        
-        # Train/test split
-        n_train = int(0.8 * len(X))
-        indices = list(range(len(X)))
-        random.shuffle(indices)
-        
-        train_idx = indices[:n_train]
-        test_idx = indices[n_train:]
-        
-        X_train, y_train = X[train_idx], [y[i] for i in train_idx]
-        X_test, y_test = X[test_idx], [y[i] for i in test_idx]
-        
-        # Check train set has multiple classes
-        if len(set(y_train)) < 2:
-            continue
-        
-        # Train SVM
-        try:
-            clf = LinearSVC(random_state=42, max_iter=1000)
-            clf.fit(X_train, y_train)
-        except Exception as e:
-            print(f"  Warning: Failed to train {key}: {e}")
-            continue  # Skip if training fails
-        
-        # Evaluate
-        train_acc = accuracy_score(y_train, clf.predict(X_train))
-        test_acc = accuracy_score(y_test, clf.predict(X_test)) if len(X_test) > 0 else 0.0
-        
-        models[key] = {
-            "classifier": clf,
-            "n_train": len(X_train),
-            "n_test": len(X_test),
-            "train_acc": train_acc,
-            "test_acc": test_acc
-        }
+        if entry is not None:
+            models[key] = entry
     
     print(f"[OK] Trained {len(models)} models")
     return models
 
 
-def main() -> None:
+def parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--eval-train", action="store_true",
+                    help="Also report training-set accuracy (one extra predict per lemma)")
+    return ap.parse_args()
+
+
+def main(eval_train: bool = False) -> None:
     print("=" * 60)
     print("BERT + SVM WSD Training")
     print("=" * 60)
@@ -165,26 +322,36 @@ def main() -> None:
     model = AutoModel.from_pretrained(BERT_MODEL)
     model.to(device)
     model.eval()
+    if can_compile(device):
+        # Compiled lazily on the first batch; dynamic shapes keep the varying
+        # bucket sizes from triggering a recompile each
+        model = torch.compile(model, dynamic=True)
+    elif device.type == "cuda":
+        print("[INFO] torch.compile unavailable (needs Triton and compute capability 7.0+), running eager")
     
     # Load SemCor
     grouped_data = load_semcor_data(SEMCOR_PATH, MAX_INSTANCES_PER_LEMMA)
     
     # Train models
-    models = train_per_lemma_models(grouped_data, tokenizer, model, device)
+    models = train_per_lemma_models(grouped_data, tokenizer, model, device,
+                                    embedding_cache_path(SEMCOR_PATH, device), eval_train)
     
     # Calculate average accuracy
     if models:
-        avg_train_acc = np.mean([m["train_acc"] for m in models.values()])
+        avg_train_acc = float(np.mean([m["train_acc"] for m in models.values()])) if eval_train else None
         avg_test_acc = np.mean([m["test_acc"] for m in models.values() if m["n_test"] > 0])
     else:
-        avg_train_acc = 0.0
+        avg_train_acc = 0.0 if eval_train else None
         avg_test_acc = 0.0
     
     print(f"\n{'='*60}")
     print("TRAINING RESULTS")
     print('='*60)
     print(f"  Models trained: {len(models)}")
-    print(f"  Avg train accuracy: {avg_train_acc:.2%}")
+    if avg_train_acc is not None:
+        print(f"  Avg train accuracy: {avg_train_acc:.2%}")
+    else:
+        print("  Avg train accuracy: skipped (use --eval-train)")
     print(f"  Avg test accuracy: {avg_test_acc:.2%}")
     
     # Save
@@ -198,17 +365,18 @@ def main() -> None:
     
     eval_results = {
         "n_models": len(models),
-        "avg_train_accuracy": round(avg_train_acc, 4),
+        "avg_train_accuracy": round(avg_train_acc, 4) if avg_train_acc is not None else None,
         "avg_test_accuracy": round(avg_test_acc, 4),
         "model_name": BERT_MODEL
     }
     
-    EVAL_OUT.write_text(json.dumps(eval_results, indent=2), encoding="utf-8")
+    EVAL_OUT.write_bytes(dumps_json(eval_results))
     
     print(f"\n[OK] Saved model to: {MODEL_OUT}")
     print(f"[OK] Saved evaluation to: {EVAL_OUT}")
 
 
 if __name__ == "__main__":
+    args = parse_args()
     random.seed(42)
-    main()
+    main(eval_train=args.eval_train)